@@ -18,4 +18,4 @@ _ELSE = '_else'
 
 _HELP = '_help'
 
-SPECIAL_ARGs = {_HELP}
+SPECIAL_ARGs = {_HELP, _OUTPUT_TRANS}  # directives to ObjWrap, not arguments of the wrapped attr
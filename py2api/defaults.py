@@ -1,4 +1,9 @@
 
 
 DFLT_LRU_CACHE_SIZE = 20
+ATTR_HANDLER_CACHE_SIZE = 128  # max number of (compiled) per-attr handlers an ObjWrap keeps
+ATTR_PATTERN_CACHE_SIZE = 64  # max number of compiled PermissibleAttr patterns shared between instances
+ATTR_MATCH_CACHE_SIZE = 128  # max number of (attr -> matched or not) results a PermissibleAttr keeps
+WEAK_CACHE_KEEP_ALIVE = 8  # number of most recently used objects a weak_value_cache keeps alive between requests
+DFLT_ASGI_THREADS = 10  # number of threads the (sync) views of an ASGI app (see mk_asgi_app) are run in
 DFLT_RESULT_FIELD = 'result'  # TODO: "result" is for backcompatibility. Change to "_result" once coordinated.
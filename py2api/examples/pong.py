@@ -20,7 +20,7 @@ Have fun
 
 
 def pong(x=0, arr=None):
-    if x is 0:
+    if x == 0:
         return 'pong'
     else:
         if arr is None:  # if x is not 0, but no arr is given, return a dict
@@ -73,8 +73,8 @@ if __name__ == "__main__":
         _ARGNAME: {  # check the name of the argument to decide on how to convert it
             'arr': {  # the way we'll convert arr depends on whether it comes from the url (args) or json.
                 _SOURCE: {  # the conversion function will be chosen according to where arr was (url-args or json)
-                    _ARGS: lambda x: np.array(list(map(float, x.split(',')))),  # convert csv string to numerical array
-                    _JSON: lambda x: np.array(x)  # convert to numpy array
+                    _ARGS: lambda x: np.array(x.split(','), dtype=float),  # convert csv string to numerical array
+                    _JSON: np.asarray  # convert to numpy array (no copy if it already is one)
                 }
             },
             'x': int  # convert to int  (this will work regardless of source, since int(10) == int('10') == 10)
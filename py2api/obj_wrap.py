@@ -8,9 +8,12 @@ Many useful utils to extend it's functionality are included elsewhere so as to e
 minimum-necessary code, crucial, for instance, for micro-services.
 """
 
+from functools import lru_cache
+
 from py2api.errors import MissingAttribute, ForbiddenAttribute
-from py2api.util import PermissibleAttr, default_to_jdict, get_attr_recursively, enhanced_docstr
+from py2api.util import PermissibleAttr, default_to_jdict, get_attr_recursively, enhanced_docstr, with_meta
 from py2api.constants import _OUTPUT_TRANS, _HELP
+from py2api.defaults import ATTR_HANDLER_CACHE_SIZE
 
 ########################################################################################################################
 # Dev Notes
@@ -25,6 +28,9 @@ so as to have extra protection against collision.
 
 
 class ObjWrap(object):
+    __slots__ = ('obj_constructor', 'obj_constructor_arg_names', '_attr_handler', '_permissible_attr', '_input_trans',
+                 '_input_trans_with_meta', '_output_trans', '_debug', '_raw_numpy_ok', '__name__')
+
     def __init__(self,
                  obj_constructor=None,
                  obj_constructor_arg_names=None,  # used to determine the params of the object constructors
@@ -32,7 +38,8 @@ class ObjWrap(object):
                  input_trans=None,  # input processing: Callable specifying how to prepare arguments for methods
                  output_trans=None,  # output processing: Function to convert output
                  name=None,
-                 debug=0):
+                 debug=0,
+                 raw_numpy_ok=False):
         """
         An class that constructs a wrapper around an object.
         An object could be a function, module, or instantiated class object (the usual case).
@@ -57,11 +64,16 @@ class ObjWrap(object):
             That is, it takes care both of extracting the attr and the (argname, val) pairs from
             request and converting the raw val (i.e. in the format given by request (often a string)) into the python
             type that the underlying function (obj specified by attr) expects.
+            If input_trans has a with_meta method, it will be used instead, and should return an
+            (attr, kwargs, meta) triple, where meta holds the special args (see SPECIAL_ARGs) apart from kwargs.
             Note the input_trans is usually constructed with a function factory class that uses it's parameters to
             adapt to each attr, similarly as with input_trans and output_trans.
         :param output_trans: (input processing) Function to convert an output before returning it to the outside world.
             Note the input_trans is usually constructed with a function factory class that uses it's parameters to
             adapt to each attr, similarly as with input_trans and output_trans.
+        :param raw_numpy_ok: Whether the output will be serialized by something handling numpy (e.g. orjson with
+            OPT_SERIALIZE_NUMPY, as mk_app's json responses are when orjson is installed), so that default_to_jdict
+            can leave numeric pandas objects to it (see default_to_jdict).
         :param cache_size: The size (and int) of the LRU cache. If equal to 1 or None, the constructed object will not
             be LRU-cached.
         """
@@ -77,13 +89,13 @@ class ObjWrap(object):
             obj_constructor_arg_names = [obj_constructor_arg_names]
         self.obj_constructor_arg_names = obj_constructor_arg_names
 
+        # per-attr handlers are compiled on first use and cached (see _mk_attr_handler)
+        self._attr_handler = lru_cache(maxsize=ATTR_HANDLER_CACHE_SIZE)(self._mk_attr_handler)
+
         if not callable(permissible_attr):
             permissible_attr = PermissibleAttr(permissible_attrs=permissible_attr)
         self.permissible_attr = permissible_attr
-        if permissible_attr is None:
-            raise ValueError("Need to permit SOME attributes for an ObjWrap to work")
 
-        assert callable(input_trans), "input_trans needs to be a callable"
         self.input_trans = input_trans  # a specification of how to convert specific argument names or types
 
         # self.obj_wrap = obj_wrap
@@ -92,13 +104,61 @@ class ObjWrap(object):
                 return result
             self.output_trans = _output_trans
         else:
-            assert callable(output_trans), "input_trans needs to be a callable"
             self.output_trans = output_trans
+        assert callable(input_trans) and callable(self.output_trans), "input_trans and output_trans must be callables"
 
         self.debug = debug
+        self.raw_numpy_ok = raw_numpy_ok
         if name is not None:
             self.__name__ = name
 
+    @property
+    def permissible_attr(self):
+        return self._permissible_attr
+
+    @permissible_attr.setter
+    def permissible_attr(self, permissible_attr):
+        if permissible_attr is None:
+            raise ValueError("Need to permit SOME attributes for an ObjWrap to work")
+        self._permissible_attr = permissible_attr
+        self._attr_handler.cache_clear()  # handlers were compiled against the previous permissions
+
+    @property
+    def input_trans(self):
+        return self._input_trans
+
+    @input_trans.setter
+    def input_trans(self, input_trans):
+        self._input_trans = input_trans
+        self._input_trans_with_meta = with_meta(input_trans)  # same, but keeping special args apart
+
+    @property
+    def output_trans(self):
+        return self._output_trans
+
+    @output_trans.setter
+    def output_trans(self, output_trans):
+        self._output_trans = output_trans
+        self._attr_handler.cache_clear()  # handlers were compiled with the previous output_trans
+
+    @property
+    def debug(self):
+        return self._debug
+
+    @debug.setter
+    def debug(self, debug):
+        self._debug = debug
+        self._attr_handler.cache_clear()  # handlers were compiled with the previous debug
+
+    @property
+    def raw_numpy_ok(self):
+        return self._raw_numpy_ok
+
+    @raw_numpy_ok.setter
+    def raw_numpy_ok(self, raw_numpy_ok):
+        self._raw_numpy_ok = raw_numpy_ok
+        self._attr_handler.cache_clear()  # handlers were compiled with the previous raw_numpy_ok
+
     def obj_attr(self, obj_spec, attr):
         """
         Method takes care of:
@@ -106,14 +166,13 @@ class ObjWrap(object):
             Giving access to an attribute of that root object.
         Does not take care of allowing or disallowing access to an attribute: robj takes care of that.
         :param obj_spec: specification of the base object
-        :param attr: The attribute we want to access
+        :param attr: The attribute we want to access (a period-separated string, or a tuple of the split path)
         :return:
         """
 
         # get or make the base object
         if isinstance(obj_spec, dict):
             obj_spec = self.obj_constructor(**obj_spec)
-            print(obj_spec, attr)
         elif isinstance(obj_spec, (tuple, list)):
             obj_spec = self.obj_constructor(*obj_spec)
         elif obj_spec is not None:
@@ -144,45 +203,71 @@ class ObjWrap(object):
 
         ###### Extract the needed data from request and format values ##################################################
         # get an input_data from the request, and format it's values (might depend on attr, so passed along)
-        attr, input_data = self.input_trans(request, **route_args)
+        attr, input_data, meta = self._input_trans_with_meta(request, **route_args)
 
-        if self.debug:
-            print(("attr={}, input_data = {}".format(attr, input_data)))
-
-        # make sure attr is there, and is permissible
+        # make sure attr is there (permissions are checked when the attr's handler is made)
         if attr is None:
             raise MissingAttribute()
-        elif not self.permissible_attr(attr):
+
+        return self._attr_handler(attr)(input_data, meta)
+
+    def _mk_attr_handler(self, attr):
+        """
+        Make the function that handles the input_data of a request for a given attr.
+        Everything that only depends on attr (permission, which constructor args to pop, etc.) is done here, once,
+        so that the returned handler only does the per-request work.
+        Handlers are cached (see self._attr_handler), so this is called only the first time an attr is requested.
+        :param attr: The attribute we want to access
+        :return: A handler(input_data, meta) function returning the (output transformed) value of the attribute
+        """
+        if not self.permissible_attr(attr):
             raise ForbiddenAttribute(attr)
 
-        ###### Get or construct the attribute object being accessed ####################################################
-        # pop off any arguments that are meant to be for the base obj (module, function, class instance) constructor
-        obj_kwargs = {k: input_data.pop(k) for k in self.obj_constructor_arg_names if k in input_data}
+        obj_constructor_arg_names = self.obj_constructor_arg_names
+        attr_path = tuple(attr.split('.'))  # split once, not at every request
+        obj_attr_for = self.obj_attr
+        output_trans_func = self.output_trans
+        if output_trans_func is default_to_jdict:  # doesn't take attr and output_trans, but can leave numpy as is
+            raw_numpy_ok = self.raw_numpy_ok
+
+            def output_trans_func(result, attr, output_trans=None):
+                return default_to_jdict(result, raw_numpy_ok=raw_numpy_ok)
+        debug = self.debug
+
+        def attr_handler(input_data, meta):
+            ###### Get or construct the attribute object being accessed ################################################
+            # pop off any arguments that are meant to be for the base obj (module, function, class instance) constructor
+            if obj_constructor_arg_names:
+                obj_kwargs = {k: input_data.pop(k) for k in obj_constructor_arg_names if k in input_data}
+            else:
+                obj_kwargs = {}
+
+            if debug:
+                print(("attr={}, obj_kwargs = {}, input_data = {}, meta = {}".format(
+                    attr, obj_kwargs, input_data, meta)))
 
-        if self.debug:
-            print(("attr={}, obj_kwargs = {}, input_data = {}".format(attr, obj_kwargs, input_data)))
+            # make the attribute object
+            obj_attr = obj_attr_for(obj_spec=obj_kwargs, attr=attr_path)
 
-        # make the attribute object
-        obj_attr = self.obj_attr(obj_spec=obj_kwargs, attr=attr)
+            ###### Handle some special args ############################################################################
+            if meta.get(_HELP):
+                return enhanced_docstr(obj_attr)
 
-        ###### Handle some special args ################################################################################
-        _help = input_data.pop(_HELP, None)
-        if _help:
-            return enhanced_docstr(obj_attr)
+            ###### Return attribute, or call it with input_data kwargs, and transform output ###########################
+            # Get the special output_trans argument, if there
+            # NOTE: Could also implement something allowing to pass arguments to output_trans_func/
+            # NOTE: Decided to avoid being even less YAGNI than I already am!
+            output_trans = meta.get(_OUTPUT_TRANS)
 
-        ###### Return attribute, or call it with input_data kwargs, and transform output ###############################
-        # Pop off the special output_trans argument, if there
-        # NOTE: Could also implement something allowing to pass arguments to output_trans_func/
-        # NOTE: Decided to avoid being even less YAGNI than I already am!
-        output_trans = input_data.pop(_OUTPUT_TRANS, None)
+            # call a method or get property
+            if callable(obj_attr):  # the user wants to call obj on the input_data arguments
+                result = obj_attr(**input_data)
+            else:  # the obj is itself the what the user wants
+                result = obj_attr
 
-        # call a method or get property
-        if callable(obj_attr):  # the user wants to call obj on the input_data arguments
-            result = obj_attr(**input_data)
-        else:  # the obj is itself the what the user wants
-            result = obj_attr
+            return output_trans_func(result, attr, output_trans=output_trans)
 
-        return self.output_trans(result, attr, output_trans=output_trans)
+        return attr_handler
 
     @classmethod
     def with_decorators(cls,
@@ -194,7 +279,8 @@ class ObjWrap(object):
                         input_trans=None,
                         output_trans=default_to_jdict,
                         name=None,
-                        debug=0):
+                        debug=0,
+                        raw_numpy_ok=False):
         if constructor_decorator is not None:
             wrapped_obj_constructor = constructor_decorator(obj_constructor)
         else:
@@ -209,7 +295,8 @@ class ObjWrap(object):
                    input_trans=input_trans,
                    output_trans=output_trans,
                    name=name,
-                   debug=debug)
+                   debug=debug,
+                   raw_numpy_ok=raw_numpy_ok)
 
 
         # :param: obj_wrap: None (default), or a decorator; a callable that takes the (obj, attr, input_data) triple and
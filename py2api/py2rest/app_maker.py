@@ -1,7 +1,52 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, current_app
 from flask_cors import CORS
 from werkzeug.exceptions import InternalServerError
+from os import cpu_count
 from platform import system as this_system
+from py2api.defaults import DFLT_ASGI_THREADS
+
+try:
+    import orjson
+
+    # datetimes are passed through to the default function, so they're serialized the way flask's json does
+    ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+except ImportError:
+    orjson = None
+
+try:
+    from flask.json.provider import DefaultJSONProvider  # flask>=2.2
+except ImportError:
+    DefaultJSONProvider = None
+
+
+def _orjson_dumps(obj, sort_keys=True, default=None):
+    """orjson.dumps(obj) with ORJSON_OPTIONS, sorting the keys if sort_keys (as flask's json does by default)"""
+    option = ORJSON_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else ORJSON_OPTIONS
+    return orjson.dumps(obj, default=default, option=option)
+
+
+if orjson is not None and DefaultJSONProvider is not None:
+    class OrjsonProvider(DefaultJSONProvider):
+        """
+        Flask json provider parsing (e.g. request.json) and serializing (e.g. jsonify) with orjson.
+        The output is the same as flask's: keys are sorted if sort_keys is set (the default), and datetimes, UUIDs,
+        dataclasses etc. are serialized by flask's default function (datetimes as HTTP dates).
+        Only non-ASCII characters aren't escaped (as with ensure_ascii=False): orjson always outputs UTF-8.
+        When dumps is given json.dumps arguments (e.g. indent), flask's json serializes obj (orjson can't honour them).
+        """
+
+        def dumps(self, obj, **kwargs):
+            if kwargs:  # e.g. indent (asked for by response() in debug mode), default or sort_keys
+                return super().dumps(obj, **kwargs)
+            try:
+                return _orjson_dumps(obj, self.sort_keys, self.default).decode()
+            except orjson.JSONEncodeError:  # something only flask's json knows how to serialize
+                return super().dumps(obj, **kwargs)
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+else:
+    OrjsonProvider = None
 
 
 class ClientError(Exception):
@@ -20,12 +65,39 @@ class ClientError(Exception):
         return rv
 
 
-def route_wrapper(route_ow, route_name=None):
-    def route_func(**route_args):
+def json_response(obj):
+    """
+    Make a json response from obj, serializing it with orjson (numpy arrays included) if it's installed, or with
+    flask's jsonify if not (or if orjson doesn't know how to serialize obj).
+    As with OrjsonProvider, keys are sorted if the app's json provider says so, and datetimes are serialized by its
+    default function (as HTTP dates, for flask's).
+    """
+    if orjson is not None:
+        json_provider = getattr(current_app, 'json', None)  # (flask>=2.2)
+        sort_keys, default = getattr(json_provider, 'sort_keys', True), getattr(json_provider, 'default', None)
         try:
-            return route_ow(request, **route_args)
-        except Exception as e:
-            raise  # if _handle_error didn't raise anything specific
+            content = _orjson_dumps(obj, sort_keys, default)
+            return current_app.response_class(content, mimetype='application/json')
+        except orjson.JSONEncodeError:
+            pass
+    return jsonify(obj)
+
+
+def route_wrapper(route_ow, route_name=None, etag=False):
+    """
+    Make a flask view function out of route_ow (a callable taking a request, and route args, such as an ObjWrap).
+    If etag, the json responses get an ETag (a hash of their content), and GET requests whose If-None-Match has it
+    get an empty 304 (Not Modified) response instead of the whole content.
+    """
+    def route_func(**route_args):
+        result = route_ow(request, **route_args)
+        if isinstance(result, (dict, list)):  # not a response yet, so make it a json one
+            response = json_response(result)
+            if etag:
+                response.add_etag()
+                response.make_conditional(request)
+            return response
+        return result
 
     if route_name is None:
         route_name = route_ow.__name__
@@ -33,8 +105,10 @@ def route_wrapper(route_ow, route_name=None):
     return route_func
 
 
-def mk_app(app_name, routes=None, app_config=None, cors=True):
+def mk_app(app_name, routes=None, app_config=None, cors=True, etag=False):
     app = Flask(app_name)
+    if OrjsonProvider is not None:
+        app.json = OrjsonProvider(app)
     if app_config is None:
         app_config = {'JSON_AS_ASCII': False}
     for k, v in list(app_config.items()):
@@ -63,20 +137,32 @@ def mk_app(app_name, routes=None, app_config=None, cors=True):
         return response
 
     if routes:
-        app = add_routes_to_app(app, routes)
+        app = add_routes_to_app(app, routes, etag=etag)
 
     return app
 
 
-def add_routes_to_app(app, routes):
+def mk_asgi_app(app_name, routes=None, app_config=None, cors=True, etag=False, threads=DFLT_ASGI_THREADS):
+    """
+    Same as mk_app, but wrapped as an ASGI application (needs a2wsgi), to be served by an ASGI server such as uvicorn.
+    The (sync) views are run in a pool of threads threads, so the event loop keeps accepting connections while they
+    work, and up to threads requests are handled at the same time (per worker process).
+    """
+    from a2wsgi import WSGIMiddleware  # only needed if you want an ASGI app
+
+    return WSGIMiddleware(mk_app(app_name, routes=routes, app_config=app_config, cors=cors, etag=etag),
+                          workers=threads)
+
+
+def add_routes_to_app(app, routes, etag=False):
     _routes = list()
     if isinstance(routes, dict):
         for route_name, route_ow in list(routes.items()):
-            _routes.append(route_wrapper(route_ow, route_name=route_name))
+            _routes.append(route_wrapper(route_ow, route_name=route_name, etag=etag))
         routes = _routes
     else:
         for route_ow in routes:
-            _routes.append(route_wrapper(route_ow))
+            _routes.append(route_wrapper(route_ow, etag=etag))
         routes = _routes
 
     for route_func in routes:
@@ -99,6 +185,28 @@ def dflt_run_app_kwargs():
     return dflt_kwargs
 
 
+def run_asgi_app(app, workers=None, threads=DFLT_ASGI_THREADS, **uvicorn_kwargs):
+    """
+    Serve an ASGI app (e.g. made with mk_asgi_app) with uvicorn (needs uvicorn), instead of flask's development server.
+    A flask app (e.g. made with mk_app) is wrapped the way mk_asgi_app does, so that its views run in a pool of threads
+    threads, and not one at a time.
+    To have several worker processes, app must be given as a 'module:attribute' import string (each worker imports it),
+    in which case workers defaults to the number of cpus. uvicorn uses uvloop and httptools if they're installed.
+    """
+    import uvicorn  # only needed (and imported) if you serve with uvicorn
+
+    if isinstance(app, Flask):
+        from a2wsgi import WSGIMiddleware
+
+        app = WSGIMiddleware(app, workers=threads)
+    if workers is None:
+        workers = cpu_count() if isinstance(app, str) else 1
+    run_kwargs = dflt_run_app_kwargs()
+    run_kwargs.pop('debug', None)  # (flask's debug mode: no uvicorn equivalent)
+    run_kwargs.update(uvicorn_kwargs)
+    uvicorn.run(app, workers=workers, **run_kwargs)
+
+
 from py2api.py2rest.obj_wrap import WebObjWrapper
 from py2api.output_trans import OutputTrans
 from py2api.py2rest.input_trans import InputTrans
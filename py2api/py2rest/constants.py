@@ -10,3 +10,5 @@ _SOURCE = '_source'
 _ARGS = '_args'
 _JSON = '_json'
 _ROUTE = '_route'
+
+MSGPACK_MIMETYPE = 'application/msgpack'  # request bodies of this type are read (as the _json source) with msgpack
@@ -1,8 +1,13 @@
 import re
 
-from py2api.constants import TRANS_NOT_FOUND, ATTR
+from py2api.constants import TRANS_NOT_FOUND, ATTR, SPECIAL_ARGs
 from py2api.constants import _ATTR, _ARGNAME, _ELSE
-from py2api.py2rest.constants import _ARGS, _JSON, _ROUTE, _SOURCE
+from py2api.py2rest.constants import _ARGS, _JSON, _ROUTE, _SOURCE, MSGPACK_MIMETYPE
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 DFLT_TRANS = {
     _ARGS: {'type': str}
@@ -20,19 +25,74 @@ def _preprocess_trans_dict(trans_dict):
     return trans_dict
 
 
+def _check_is_map(data, body_format):
+    """Raise a BadRequest (400) if the data of a (body_format) request body isn't a map of arguments"""
+    if not isinstance(data, dict):
+        from werkzeug.exceptions import BadRequest  # (only werkzeug requests have bodies to check)
+
+        raise BadRequest("The {} body must be a map of arguments, not a {}".format(body_format, type(data).__name__))
+
+
+def _unpack_msgpack_data(body):
+    """The {argname: val, ...} dict packed in a msgpack request body, or a BadRequest (400) if it's not one"""
+    from werkzeug.exceptions import BadRequest  # (only requests having a mimetype get here, so werkzeug is installed)
+
+    try:
+        data = msgpack.unpackb(body, raw=False)
+    except (ValueError, TypeError, msgpack.UnpackException) as e:  # (msgpack's errors are mostly ValueErrors)
+        raise BadRequest("The msgpack body couldn't be decoded: {}".format(e))
+    _check_is_map(data, 'msgpack')
+    return data
+
+
 def get_request_data_from_source(request, source):
+    """
+    Get an iterable of the (argname, val) pairs of the given source of the request.
+    Note: The iterable is meant to be iterated over once (it's a dict view or iterator, not a copy of the data).
+    """
     if source == _JSON:
-        if hasattr(request, 'json') and request.json:
-            return list(request.json.items())
+        if msgpack is not None and getattr(request, 'mimetype', None) == MSGPACK_MIMETYPE:
+            # binary payload: no text (json) parsing of (often large) numerical data
+            data = _unpack_msgpack_data(request.get_data())
+        elif hasattr(request, 'get_json'):
+            # no body, or a non-json one, is just no data (recent flask's request.json would raise a 415), but a
+            # malformed json body is still a bad request (400)
+            data = request.get_json() if getattr(request, 'is_json', True) else None
+            if data is not None:
+                _check_is_map(data, 'json')
         else:
-            return {}
+            data = getattr(request, 'json', None)
     elif source == _ARGS:
-        if hasattr(request, 'args') and request.args:
-            return list(request.args.items())
-        else:
-            return {}
+        data = getattr(request, 'args', None)
     else:
         raise ValueError("This source isn't recognized: {}".format(source))
+    return data.items() if data else ()
+
+
+_OTHER = object()  # stands for any source, attr, or argname that a trans_spec doesn't mention
+_FIELDS = (_SOURCE, _ATTR, _ARGNAME)
+
+
+def _names_under(trans_spec, field):
+    """
+    The set of keys of all the field (_SOURCE, _ATTR or _ARGNAME) dicts found (recursively) in trans_spec.
+    >>> trans_spec = {_ARGNAME: {'x': int, 'y': {_ATTR: {'f': float}}}, _ELSE: {_ARGNAME: {'z': str}}}
+    >>> sorted(_names_under(trans_spec, _ARGNAME)), sorted(_names_under(trans_spec, _ATTR))
+    (['x', 'y', 'z'], ['f'])
+    >>> _names_under(int, _ATTR)
+    set()
+    """
+    names = set()
+    if isinstance(trans_spec, dict):
+        for key, val in trans_spec.items():
+            if key in _FIELDS:
+                if key == field:
+                    names.update(val)
+                for _trans_spec in val.values():
+                    names |= _names_under(_trans_spec, field)
+            elif key == _ELSE:
+                names |= _names_under(val, field)
+    return names
 
 
 class InputTrans(object):
@@ -219,8 +279,15 @@ class InputTrans(object):
     ...         'other_arg': 'another arg',
     ...         'float_1': 2.71, 'int_1': 34}
     >>> assert got == expected
+    >>>
+    >>> # An _ELSE only converts what the other fields of its trans_spec have no conversion for
+    >>> input_trans = InputTrans({_ARGNAME: {'x': int}, _ELSE: str.upper})
+    >>> input_trans(MockRequest('?attr=f&x=3&y=why'))
+    ('f', {'x': 3, 'y': 'WHY'})
     """
 
+    __slots__ = ('_trans_spec', 'dflt_spec', 'sources', '_trans_table')  # read at every request: no instance __dict__
+
     def __init__(self, trans_spec=None, dflt_spec=None, sources=(_JSON, _ARGS, _ROUTE)):
         if trans_spec is None:
             trans_spec = {}
@@ -230,85 +297,68 @@ class InputTrans(object):
         self.dflt_spec = dflt_spec
         self.sources = sources
 
+    @property
+    def trans_spec(self):
+        return self._trans_spec
+
+    @trans_spec.setter
+    def trans_spec(self, trans_spec):
+        self._trans_spec = trans_spec
+        self._trans_table = self._mk_trans_table()  # conversions are resolved against the trans_spec of the moment
+
+    def _mk_trans_table(self):
+        """
+        Resolve search_trans_func once and for all for every (source, attr, argname) that trans_spec can tell apart.
+        The resolution only depends on whether these are mentioned in trans_spec, so any source, attr or argname that
+        isn't is represented by _OTHER.
+        :return: (sources, attrs, argnames, table) where table is an {attr: {source: {argname: trans_func, ...}}}
+            dict (nested in that order so that a request fetches its attr's table once, and each source's once),
+            whose innermost dicts only have the argnames that have a trans_func
+        """
+        trans_spec = self.trans_spec
+        sources, attrs, argnames = (_names_under(trans_spec, field) for field in _FIELDS)
+        table = {}
+        for attr in attrs | {_OTHER}:
+            attr_table = table[attr] = {}
+            for source in sources | {_OTHER}:
+                source_table = attr_table[source] = {}
+                for argname in argnames | {_OTHER}:
+                    trans_func = self.search_trans_func(attr, argname, None, trans_spec=trans_spec, source=source)
+                    if trans_func is not TRANS_NOT_FOUND:
+                        source_table[argname] = trans_func
+        return sources, attrs, argnames, table
+
     @classmethod
     def from_argname_trans_dict(cls, argname_trans_dict):
         return cls(trans_spec={_ARGNAME: argname_trans_dict})
 
     def search_trans_func(self, attr, argname, val, trans_spec, source=None):
-        trans_func = TRANS_NOT_FOUND  # fallback default (i.e. "found nothing")
-        if callable(trans_spec):
-            return trans_spec
-        elif isinstance(trans_spec, dict):
-            if len(trans_spec) == 0:
-                return TRANS_NOT_FOUND
-            elif len(trans_spec) > 0:
-
-                def search_in_field(trans_spec, field, field_val):
-                    trans_func = TRANS_NOT_FOUND
-                    _trans_spec = trans_spec.get(field, {}).get(field_val, TRANS_NOT_FOUND)
-                    if _trans_spec:
-                        trans_func = self.search_trans_func(attr, argname, val, trans_spec=_trans_spec, source=source)
-
-                    return trans_func
-
-                ############### search _SOURCE, _ATTR, and _ARGNAME ###############
-                # TODO: Would like to include as search_in_field(trans_spec, _SOURCE, source) in the or below.
-                if source is not None:  # only do this if there's an actual source specified
-                    _trans_spec = trans_spec.get(_SOURCE, {}).get(source, {})
-                    if _trans_spec:
-                        trans_func = self.search_trans_func(attr, argname, val, trans_spec=_trans_spec, source=source)
-
-                    if trans_func is not TRANS_NOT_FOUND:
-                        return trans_func
-
-                trans_func = \
-                    search_in_field(trans_spec, _ATTR, attr) \
-                    or search_in_field(trans_spec, _ARGNAME, argname)
-
-                # ############### search _SOURCE ###############
-                # if source is not None:  # only do this if there's an actual source specified
-                #     _trans_spec = trans_spec.get(_SOURCE, {}).get(source, {})
-                #     if _trans_spec:
-                #         trans_func = self.search_trans_func(attr, argname, val, trans_spec=_trans_spec, source=source)
-                #
-                #     if trans_func is not TRANS_NOT_FOUND:
-                #         return trans_func
-                #
-                # ############### search _ATTR ###############
-                # _trans_spec = trans_spec.get(_ATTR, {}).get(attr, {})
-                # if _trans_spec:
-                #     trans_func = self.search_trans_func(attr, argname, val,
-                #                                         trans_spec=_trans_spec,
-                #                                         source=source)
-                #
-                # if trans_func is not TRANS_NOT_FOUND:
-                #     return trans_func
-                #
-                # ############### search _ARGNAME ###############
-                # _trans_spec = trans_spec.get(_ARGNAME, {}).get(argname, TRANS_NOT_FOUND)
-                # if _trans_spec:
-                #     trans_func = self.search_trans_func(attr, argname, val,
-                #                                         trans_spec=_trans_spec,
-                #                                         source=source)
-                # if trans_func is not TRANS_NOT_FOUND:
-                #     return trans_func
-
-                ############### _ELSE ###############
+        """
+        Find the trans_func of (source, attr, argname) in trans_spec, searching depth-first, in the order
+        _SOURCE, _ATTR, _ARGNAME, _ELSE, for the first callable (see class docs). Returns TRANS_NOT_FOUND if none.
+        (Done with an explicit stack, not recursion; the nested trans_specs of a node are pushed in reverse order, so
+        that they're popped, and searched, in order.)
+        """
+        stack = [trans_spec]
+        while stack:
+            trans_spec = stack.pop()
+            if callable(trans_spec):
+                return trans_spec
+            elif isinstance(trans_spec, dict) and trans_spec:
                 _trans_spec = trans_spec.get(_ELSE, TRANS_NOT_FOUND)
                 if _trans_spec:
-                    trans_func = self.search_trans_func(attr, argname, val,
-                                                        trans_spec=_trans_spec,
-                                                        source=source)
-                if trans_func is not TRANS_NOT_FOUND:
-                    return trans_func
-                else:
-                    return TRANS_NOT_FOUND
-                    # if _ELSE in trans_spec:
-                    #     return self.search_trans_func(attr, argname, val, trans_spec[_ELSE], source=source)
-                    # else:
-                    #     return TRANS_NOT_FOUND
-        else:
-            return TRANS_NOT_FOUND
+                    stack.append(_trans_spec)
+                _trans_spec = trans_spec.get(_ARGNAME, {}).get(argname, TRANS_NOT_FOUND)
+                if _trans_spec:
+                    stack.append(_trans_spec)
+                _trans_spec = trans_spec.get(_ATTR, {}).get(attr, TRANS_NOT_FOUND)
+                if _trans_spec:
+                    stack.append(_trans_spec)
+                if source is not None:  # only do this if there's an actual source specified
+                    _trans_spec = trans_spec.get(_SOURCE, {}).get(source, TRANS_NOT_FOUND)
+                    if _trans_spec:
+                        stack.append(_trans_spec)
+        return TRANS_NOT_FOUND
 
     def _get_attr_from_request(self, request, **route_args):
         attr = route_args.get(ATTR)
@@ -321,32 +371,56 @@ class InputTrans(object):
         Extract data to call it with (converting the request data for the given attribute
         (including defaults if any are specified)
         :param request: A flask Request object
-        :return: input_dict, where input_dict is an {arg: val, ...} dict
+        :return: (attr, input_dict), where input_dict is an {arg: val, ...} dict (special args included)
+        """
+        attr, input_dict, meta = self.with_meta(request, **route_args)
+        input_dict.update(meta)
+        return attr, input_dict
+
+    def with_meta(self, request, **route_args):
+        """
+        Same as __call__, but keeps the special args (see SPECIAL_ARGs, e.g. _help or _output_trans) apart, so that
+        they don't have to be popped off of input_dict downstream.
+        :param request: A flask Request object
+        :return: (attr, input_dict, meta), where input_dict and meta are {arg: val, ...} dicts
         """
         # get the attr from the request
         attr = self._get_attr_from_request(request)
 
         # start with specific defaults for that attr, if it exist, or an empty dict if not
-        input_dict = self.dflt_spec.get(attr, {})
+        input_dict = dict(self.dflt_spec.get(attr, {}))
+        meta = {}
+
+        trans_sources, trans_attrs, trans_argnames, trans_table = self._trans_table
+        attr_trans_table = trans_table[attr if attr in trans_attrs else _OTHER]  # the trans_funcs for this attr
+        # module constants used for every argument, as locals
+        attr_arg, special_args, other, not_found = ATTR, SPECIAL_ARGs, _OTHER, TRANS_NOT_FOUND
 
         for source in self.sources:  # loop through sources
             if source == _ROUTE:
-                request_data = route_args
+                request_data = route_args.items()
             else:
                 request_data = get_request_data_from_source(request, source)  # get the data (dict) of this source
+            source_trans_table = attr_trans_table[source if source in trans_sources else other]
+            if not source_trans_table:  # nothing to convert (e.g. empty trans_spec), so take the vals as they are
+                for argname, val in request_data:
+                    if argname != attr_arg:
+                        (meta if argname in special_args else input_dict)[argname] = val
+                continue
             for argname, val in request_data:  # loop through the (arg, val) pairs of this data...
-                if argname == ATTR:
+                if argname == attr_arg:
                     continue
+                target = meta if argname in special_args else input_dict
                 # ... and see if there's a trans_func to convert the val
-                trans_func = self.search_trans_func(attr, argname, val, trans_spec=self.trans_spec, source=source)
-                if trans_func is not TRANS_NOT_FOUND:  # if there is...
-                    input_dict[argname] = trans_func(val)  # ... convert the val
+                trans_func = source_trans_table.get(argname if argname in trans_argnames else other, not_found)
+                if trans_func is not not_found:  # if there is...
+                    target[argname] = trans_func(val)  # ... convert the val
                 else:  # if there's not...
-                    input_dict[argname] = val  # ... just take the val as is
+                    target[argname] = val  # ... just take the val as is
 
         input_dict.pop(ATTR, None)  # in case ATTR was in input_dict, remove it.
 
-        return attr, input_dict
+        return attr, input_dict, meta
 
 
 re_type = type(re.compile('.'))
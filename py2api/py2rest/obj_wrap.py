@@ -1,13 +1,86 @@
 
 
-from functools import lru_cache
-from py2api.defaults import DFLT_LRU_CACHE_SIZE
+from collections import OrderedDict
+from functools import lru_cache, partial, wraps
+from threading import Lock
+from weakref import WeakValueDictionary
+from py2api.defaults import DFLT_LRU_CACHE_SIZE, WEAK_CACHE_KEEP_ALIVE
 from py2api import ObjWrap
 
 
+def weak_value_cache(func, keep_alive=WEAK_CACHE_KEEP_ALIVE):
+    """
+    Decorator that caches the objects func makes only as long as they're referenced somewhere else, so that objects
+    nobody uses anymore can be garbage collected (instead of being pinned by an lru_cache).
+    Since a request doesn't reference its object once it's answered, the keep_alive most recently used objects are
+    also kept (strongly) referenced, so that consecutive requests for the same object don't each construct it.
+    The objects func returns must be weak-referencable (e.g. instances of ordinary classes, but not ints or tuples).
+    Objects are constructed outside of the cache's lock (so that slow constructions don't hold up the others), but
+    concurrent calls with the same arguments wait for the one construction.
+
+    >>> class Thing(object):
+    ...     pass
+    >>> constructed = []
+    >>> @weak_value_cache
+    ... def mk_thing(x):
+    ...     constructed.append(x)
+    ...     return Thing()
+    >>> for _ in range(5):
+    ...     _ = mk_thing(1).__class__  # the thing isn't referenced anywhere after this
+    >>> constructed
+    [1]
+    """
+    cache = WeakValueDictionary()
+    recently_used = OrderedDict()  # key -> obj, strong references to the keep_alive most recently used objects
+    constructing = {}  # key -> lock held while the object of key is being constructed
+    lock = Lock()
+
+    def _keep_alive(key, obj):  # to be called with lock held
+        if keep_alive:
+            recently_used[key] = obj
+            recently_used.move_to_end(key)
+            if len(recently_used) > keep_alive:
+                recently_used.popitem(last=False)
+
+    def _get(key):  # to be called with lock held
+        obj = cache.get(key)
+        if obj is not None:
+            _keep_alive(key, obj)
+        return obj
+
+    @wraps(func)
+    def cached_func(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        with lock:
+            obj = _get(key)
+            if obj is not None:
+                return obj
+            key_lock = constructing.get(key)
+            if key_lock is None:
+                key_lock = constructing[key] = Lock()
+        with key_lock:  # so that concurrent requests don't construct the same object twice
+            with lock:
+                obj = _get(key)
+            if obj is None:
+                try:
+                    obj = func(*args, **kwargs)
+                    with lock:
+                        cache[key] = obj
+                        _keep_alive(key, obj)
+                finally:
+                    with lock:
+                        if constructing.get(key) is key_lock:
+                            del constructing[key]
+        return obj
+
+    return cached_func
+
+
 # TODO: "file" is for backcompatibility. Change to "_file" once coordinated.
 
 class WebObjWrapper(ObjWrap):
+    __slots__ = ()
+
     @classmethod
     def with_lru_cache(cls,
                        cache_size=DFLT_LRU_CACHE_SIZE,
@@ -17,14 +90,57 @@ class WebObjWrapper(ObjWrap):
                        permissible_attr=None,  # what attributes are allowed to be accessed
                        output_trans=None,
                        name=None,
-                       debug=0):
+                       debug=0,
+                       raw_numpy_ok=False):
+        """
+        Make a wrapper whose constructed objects are kept in a (C implemented) functools.lru_cache.
+        cache_size=None means an unbounded cache. cache_size=0, or a non-callable obj_constructor (i.e. the object
+        itself is given), means nothing to cache, so obj_constructor is used as is.
+        """
+        if cache_size == 0 or not callable(obj_constructor):
+            constructor_decorator = None
+        else:
+            constructor_decorator = lru_cache(maxsize=cache_size)
+        return cls.with_decorators(
+            constructor_decorator=constructor_decorator,
+            obj_constructor=obj_constructor,
+            obj_constructor_arg_names=obj_constructor_arg_names,
+            permissible_attr=permissible_attr,
+            input_trans=input_trans,
+            output_trans=output_trans,
+            name=name,
+            debug=debug,
+            raw_numpy_ok=raw_numpy_ok
+        )
+
+    @classmethod
+    def with_weak_cache(cls,
+                        obj_constructor=None,
+                        obj_constructor_arg_names=None,  # used to determine the params of the object constructors
+                        input_trans=None,
+                        permissible_attr=None,  # what attributes are allowed to be accessed
+                        output_trans=None,
+                        name=None,
+                        debug=0,
+                        keep_alive=WEAK_CACHE_KEEP_ALIVE,
+                        raw_numpy_ok=False):
+        """
+        Make a wrapper whose constructed objects are shared for as long as they're in use (see weak_value_cache),
+        instead of being kept around (by an lru_cache) until enough other objects are constructed.
+        Only the keep_alive most recently used objects are kept around once nothing else uses them.
+        """
+        if callable(obj_constructor):
+            constructor_decorator = partial(weak_value_cache, keep_alive=keep_alive)
+        else:
+            constructor_decorator = None
         return cls.with_decorators(
-            constructor_decorator=lru_cache(maxsize=cache_size),
+            constructor_decorator=constructor_decorator,
             obj_constructor=obj_constructor,
             obj_constructor_arg_names=obj_constructor_arg_names,
             permissible_attr=permissible_attr,
             input_trans=input_trans,
             output_trans=output_trans,
             name=name,
-            debug=debug
+            debug=debug,
+            raw_numpy_ok=raw_numpy_ok
         )
@@ -1,7 +1,9 @@
-
+import asyncio
 
 import requests
 from requests import Request, Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 DFLT_ROOT_URL = 'https://dev.otosense.ai/'
 
@@ -30,8 +32,14 @@ class Rest2Py(object):
         pass
 
 
+def dflt_max_retries():
+    # only retries connection problems, and (for idempotent methods only) gateway errors, so POSTs aren't replayed
+    return Retry(total=3, backoff_factor=0.1, status_forcelist=[502, 503, 504])
+
+
 class API(object):
-    def __init__(self, root_url=DFLT_ROOT_URL, route_root=None):
+    def __init__(self, root_url=DFLT_ROOT_URL, route_root=None, pool_connections=32, pool_maxsize=64,
+                 max_retries=None, debug=False):
         if not root_url.endswith('/'):
             root_url += '/'
         if route_root is None:
@@ -41,7 +49,14 @@ class API(object):
                 route_root += '/'
         self.root_url = root_url + route_root
         self.session = Session()
-        self.last_request = None
+        if max_retries is None:
+            max_retries = dflt_max_retries()
+        # keep (up to pool_maxsize) connections alive, so calls don't pay for a new connection (and handshake) each time
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=max_retries)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.debug = debug
+        self.last_request = None  # only kept if debug
 
     def url(self, url_suffix):
         return self.root_url + url_suffix
@@ -57,12 +72,47 @@ class API(object):
 
     def call_attr(self, attr, **kwargs):
         url_suffix = '?attr={attr}'.format(attr=attr)
-        req = self.request(method='POST', url_suffix=url_suffix, json=kwargs)
-        if not hasattr(req, 'args'):
-            req.args = {'attr': attr}
-        self.last_request = req
-        response = self.prepare_and_send_request(req)
+        if self.debug:
+            req = self.request(method='POST', url_suffix=url_suffix, json=kwargs)
+            if not hasattr(req, 'args'):
+                req.args = {'attr': attr}
+            self.last_request = req
+            response = self.prepare_and_send_request(req)
+        else:
+            response = self.session.post(self.url(url_suffix), json=kwargs)
         if response.status_code != 200:
             self.last_non_200_response = response
         return response.content
+
+    def mk_async_client(self):
+        """
+        Make an httpx.AsyncClient for the async calls (needs httpx).
+        A client is tied to the event loop it's first used in, so one is made (and closed) per call_many (or
+        call_attr_async) call, instead of being kept by the API. Its connections are reused within the call.
+        """
+        import httpx  # only needed (and imported) if you use the async calls
+
+        return httpx.AsyncClient(base_url=self.root_url, limits=httpx.Limits(max_connections=64))
+
+    async def _call_attr_async(self, client, attr, kwargs):
+        response = await client.post(self.url('?attr={attr}'.format(attr=attr)), json=kwargs)
+        if response.status_code != 200:
+            self.last_non_200_response = response
+        return response.content
+
+    async def call_attr_async(self, attr, **kwargs):
+        async with self.mk_async_client() as client:
+            return await self._call_attr_async(client, attr, kwargs)
+
+    async def call_many(self, calls):
+        """
+        Make several calls concurrently (sharing the connections of one client), and get their contents (in the same
+        order).
+        :param calls: An iterable of (attr, kwargs) pairs
+        :return: A list of the contents of the responses
+
+        For example, from sync code: asyncio.run(api.call_many([('foo', {'x': 1}), ('bar', {})]))
+        """
+        async with self.mk_async_client() as client:
+            return await asyncio.gather(*(self._call_attr_async(client, attr, kwargs) for attr, kwargs in calls))
         # '?attr = can_projects & access = c_citypa_3 @ otosense.com, fv_mgc, prod'
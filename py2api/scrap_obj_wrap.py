@@ -104,11 +104,9 @@ class ObjWrap(object):
         the constructed object will not
             be LRU-cached.
         """
-        must_be_callable = [input_trans, obj_wrap, output_trans]
-        for f in must_be_callable:
-            assert callable(
-                f
-            ), 'input_trans, obj_wrap, output_trans must all be callables'
+        assert (
+            callable(input_trans) and callable(obj_wrap) and callable(output_trans)
+        ), 'input_trans, obj_wrap, output_trans must all be callables'
 
         if isinstance(cache_size, int) and cache_size != 1:
             self.obj_constructor = lru_cache(cache_size=cache_size)(obj_constructor)
@@ -0,0 +1,123 @@
+import pytest
+
+pytest.importorskip('flask')
+
+from py2api.py2rest.obj_wrap import WebObjWrapper
+from py2api.py2rest.input_trans import InputTrans
+from py2api.py2rest.app_maker import mk_app
+from py2api.util import default_to_jdict
+
+
+class Tables(object):
+    def numbers(self):
+        import pandas as pd
+        return pd.DataFrame({'x': [1, 2], 'y': [0.5, 1.5]}, index=['a', 'b'])
+
+    def dates(self):
+        import pandas as pd
+        return pd.DataFrame({'x': [1, 2]}, index=pd.to_datetime(['2020-01-01', '2020-01-02']))
+
+
+def mk_tables_wrapper(**kwargs):
+    return WebObjWrapper.with_decorators(obj_constructor=Tables,
+                                         permissible_attr=['numbers', 'dates'],
+                                         input_trans=InputTrans(),
+                                         output_trans=default_to_jdict,
+                                         name='/tables',
+                                         **kwargs)
+
+
+def test_mk_app_leaves_the_routes_as_they_are():
+    wrapper = mk_tables_wrapper()
+    mk_app('tables', routes=[wrapper])
+    assert wrapper.raw_numpy_ok is False
+
+
+@pytest.mark.parametrize('raw_numpy_ok', [False, True])
+def test_tables_are_served_whether_raw_numpy_ok_or_not(raw_numpy_ok):
+    pytest.importorskip('pandas')
+    client = mk_app('tables', routes=[mk_tables_wrapper(raw_numpy_ok=raw_numpy_ok)]).test_client()
+    r = client.get('/tables?attr=numbers')
+    assert r.status_code == 200
+    assert r.json == {'x': {'a': 1, 'b': 2}, 'y': {'a': 0.5, 'b': 1.5}}
+    r = client.get('/tables?attr=dates')  # datetime indices aren't left to orjson (which can't have them as keys)
+    assert r.status_code == 200
+    assert r.json == {'x': {'1577836800000': 1, '1577923200000': 2}}
+
+
+def test_asgi_app_handles_requests_concurrently():
+    pytest.importorskip('a2wsgi')
+    httpx = pytest.importorskip('httpx')
+    import asyncio
+    from threading import Barrier
+    from py2api.py2rest.app_maker import mk_asgi_app
+
+    all_in_flight = Barrier(4, timeout=5)  # broken (so raising, and answering with a 500) unless 4 requests overlap
+
+    class Meeting(object):
+        def meet(self):
+            return all_in_flight.wait()
+
+    wrapper = WebObjWrapper(obj_constructor=Meeting, permissible_attr=['meet'], input_trans=InputTrans(),
+                            output_trans=default_to_jdict, name='/meeting')
+    app = mk_asgi_app('meeting', routes=[wrapper])
+
+    async def get_four_times():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+            return await asyncio.gather(*(client.get('/meeting?attr=meet') for _ in range(4)))
+
+    responses = asyncio.run(get_four_times())
+    assert [r.status_code for r in responses] == [200] * 4
+    assert sorted(r.json()['result'] for r in responses) == [0, 1, 2, 3]  # (each waiter gets its own index)
+
+
+def test_json_responses_are_the_same_as_flasks():
+    import json
+    from datetime import datetime
+    from flask.json.provider import DefaultJSONProvider
+    from py2api.py2rest.app_maker import json_response
+
+    obj = {'b': 1, 'a': datetime(2020, 1, 2, 3, 4, 5), 'c': [{'z': None, 'y': 0.5}]}
+    app = mk_app('json')
+    flask_json = DefaultJSONProvider(app)
+    with app.app_context():
+        for sort_keys in (True, False):
+            app.json.sort_keys = flask_json.sort_keys = sort_keys
+            for content in (json_response(obj).get_data(as_text=True), app.json.dumps(obj)):
+                assert json.loads(content) == json.loads(flask_json.dumps(obj))  # (datetimes as HTTP dates included)
+                assert list(json.loads(content)) == list(json.loads(flask_json.dumps(obj)))  # same key order
+
+
+def test_routes_need_not_be_hashable():
+    class UnhashableRoute(object):
+        __name__ = '/unhashable'
+
+        def __eq__(self, other):  # (which sets __hash__ to None)
+            return self is other
+
+        def __call__(self, request, **route_args):
+            return {'result': 'ok'}
+
+    client = mk_app('unhashable', routes=[UnhashableRoute()]).test_client()
+    assert client.get('/unhashable').json == {'result': 'ok'}
+
+
+def test_route_args_are_passed_on_whatever_their_name():
+    class EchoRoute(object):
+        __name__ = '/echo/<_request>'
+
+        def __call__(self, request, **route_args):
+            return {'route_args': route_args, 'path': request.path}
+
+    client = mk_app('echo', routes=[EchoRoute()]).test_client()
+    assert client.get('/echo/me').json == {'route_args': {'_request': 'me'}, 'path': '/echo/me'}
+
+
+def test_json_dumps_arguments_are_honoured():
+    app = mk_app('json')
+    assert app.json.dumps({'b': 1, 'a': 2}, indent=2) == '{\n  "a": 2,\n  "b": 1\n}'
+    assert app.json.dumps({'b': 1, 'a': 2}, sort_keys=False, separators=(',', ':')) == '{"b":1,"a":2}'
+    app.debug = True  # so that jsonify indents its output
+    with app.app_context():
+        from flask import jsonify
+        assert jsonify({'a': 1}).get_data(as_text=True) == '{\n  "a": 1\n}\n'
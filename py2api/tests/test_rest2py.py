@@ -0,0 +1,43 @@
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('httpx')
+
+import asyncio
+import json
+from threading import Thread
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+from py2api.py2rest.obj_wrap import WebObjWrapper
+from py2api.py2rest.input_trans import InputTrans
+from py2api.py2rest.app_maker import mk_app
+from py2api.py2rest.rest2py import API
+from py2api.util import default_to_jdict
+
+
+class Echo(object):
+    def echo(self, x=None):
+        return x
+
+
+@pytest.fixture(scope='module')
+def api():
+    wrapper = WebObjWrapper(obj_constructor=Echo, permissible_attr=['echo'], input_trans=InputTrans(),
+                            output_trans=default_to_jdict, name='/')
+
+    class KeepAliveRequestHandler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'  # so that clients keep their connections (across event loops, if they can)
+
+    server = make_server('127.0.0.1', 0, mk_app('echo', routes=[wrapper]), threaded=True,
+                         request_handler=KeepAliveRequestHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    yield API('http://127.0.0.1:{}'.format(server.server_port))
+    server.shutdown()
+
+
+def test_call_many_works_in_consecutive_event_loops(api):
+    calls = [('echo', {'x': 1}), ('echo', {'x': 'two'})]
+    for _ in range(2):  # each asyncio.run has its own event loop
+        contents = asyncio.run(api.call_many(calls))
+        assert [json.loads(content) for content in contents] == [{'result': 1}, {'result': 'two'}]
+    assert json.loads(asyncio.run(api.call_attr_async('echo', x=3))) == {'result': 3}
@@ -0,0 +1,118 @@
+import pytest
+
+pytest.importorskip('flask')
+
+from py2api.py2rest.obj_wrap import WebObjWrapper
+from py2api.py2rest.input_trans import InputTrans
+from py2api.py2rest.app_maker import mk_app
+from py2api.util import default_to_jdict
+
+
+class Greeter(object):
+    constructions = 0
+
+    def __init__(self, user='world'):
+        Greeter.constructions += 1
+        self.user = user
+
+    def greet(self):
+        return 'Hello {}!'.format(self.user)
+
+
+def mk_greeter_client(wrapper_factory, **kwargs):
+    wrapper = wrapper_factory(obj_constructor=Greeter,
+                              obj_constructor_arg_names=['user'],
+                              permissible_attr=['greet'],
+                              input_trans=InputTrans(),
+                              output_trans=default_to_jdict,
+                              name='/greeter',
+                              **kwargs)
+    return mk_app('greeter', routes=[wrapper]).test_client()
+
+
+def test_weak_cache_constructs_once_for_consecutive_requests():
+    client = mk_greeter_client(WebObjWrapper.with_weak_cache)
+    Greeter.constructions = 0
+    for _ in range(5):
+        r = client.get('/greeter?attr=greet&user=me')
+        assert r.status_code == 200
+        assert r.json == {'result': 'Hello me!'}
+    assert Greeter.constructions == 1
+
+
+def test_weak_cache_only_keeps_alive_the_most_recently_used():
+    client = mk_greeter_client(WebObjWrapper.with_weak_cache, keep_alive=1)
+    Greeter.constructions = 0
+    for user in ('me', 'you', 'me'):
+        assert client.get('/greeter?attr=greet&user={}'.format(user)).status_code == 200
+    assert Greeter.constructions == 3
+
+
+def test_weak_cache_constructs_concurrently_but_once_per_key():
+    from concurrent.futures import ThreadPoolExecutor
+    from threading import Barrier
+    from py2api.py2rest.obj_wrap import weak_value_cache
+
+    constructed = []
+    both_constructing = Barrier(2, timeout=5)  # broken (so raising) unless 'me' and 'you' are constructed at once
+
+    @weak_value_cache
+    def mk_slow_greeter(user):
+        both_constructing.wait()
+        constructed.append(user)
+        return Greeter(user)
+
+    with ThreadPoolExecutor(4) as executor:
+        greeters = list(executor.map(mk_slow_greeter, ['me', 'me', 'you', 'you']))
+    assert sorted(constructed) == ['me', 'you']
+    assert greeters[0] is greeters[1] and greeters[2] is greeters[3]
+
+
+def test_json_bodies_are_parsed_and_others_ignored():
+    client = mk_greeter_client(WebObjWrapper.with_lru_cache)
+    assert client.post('/greeter?attr=greet', json={'user': 'me'}).json == {'result': 'Hello me!'}
+    assert client.post('/greeter?attr=greet').json == {'result': 'Hello world!'}  # no body
+    r = client.post('/greeter?attr=greet', data='user=me', content_type='text/plain')  # not json, so no data
+    assert r.json == {'result': 'Hello world!'}
+    r = client.post('/greeter?attr=greet', data='{"user": ', content_type='application/json')
+    assert r.status_code == 400
+    r = client.post('/greeter?attr=greet', json=['me'])  # json, but not a map of arguments
+    assert r.status_code == 400
+
+
+def test_bad_msgpack_bodies_are_bad_requests():
+    msgpack = pytest.importorskip('msgpack')
+    from py2api.py2rest.constants import MSGPACK_MIMETYPE
+
+    client = mk_greeter_client(WebObjWrapper.with_lru_cache)
+    r = client.post('/greeter?attr=greet', data=msgpack.packb({'user': 'me'}), content_type=MSGPACK_MIMETYPE)
+    assert r.json == {'result': 'Hello me!'}
+    r = client.post('/greeter?attr=greet', data=b'\xc1', content_type=MSGPACK_MIMETYPE)  # (0xc1 is never used)
+    assert r.status_code == 400
+    r = client.post('/greeter?attr=greet', data=msgpack.packb(['me']), content_type=MSGPACK_MIMETYPE)
+    assert r.status_code == 400
+
+
+def test_reassigned_output_trans_and_debug_are_used(capsys):
+    wrapper = WebObjWrapper(obj_constructor=Greeter, obj_constructor_arg_names=['user'], permissible_attr=['greet'],
+                            input_trans=InputTrans(), output_trans=default_to_jdict, name='/greeter')
+    client = mk_app('greeter', routes=[wrapper]).test_client()
+    assert client.get('/greeter?attr=greet').json == {'result': 'Hello world!'}
+    wrapper.output_trans = lambda result, attr, output_trans=None: {'greeting': result}
+    wrapper.debug = 1
+    assert client.get('/greeter?attr=greet').json == {'greeting': 'Hello world!'}
+    assert 'attr=greet' in capsys.readouterr().out
+
+
+def test_reassigned_and_subclassed_input_trans_are_used():
+    class ShoutingInputTrans(InputTrans):
+        def __call__(self, request, **route_args):
+            attr, input_data = super(ShoutingInputTrans, self).__call__(request, **route_args)
+            return attr, {k: v.upper() for k, v in input_data.items()}
+
+    wrapper = WebObjWrapper(obj_constructor=Greeter, obj_constructor_arg_names=['user'], permissible_attr=['greet'],
+                            input_trans=InputTrans(), output_trans=default_to_jdict, name='/greeter')
+    client = mk_app('greeter', routes=[wrapper]).test_client()
+    assert client.get('/greeter?attr=greet&user=me').json == {'result': 'Hello me!'}
+    wrapper.input_trans = ShoutingInputTrans()
+    assert client.get('/greeter?attr=greet&user=me').json == {'result': 'Hello ME!'}
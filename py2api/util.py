@@ -2,9 +2,13 @@
 
 import json
 import re
+from functools import lru_cache
 from inspect import getargspec
 
-from .defaults import DFLT_RESULT_FIELD
+from .defaults import DFLT_RESULT_FIELD, ATTR_PATTERN_CACHE_SIZE, ATTR_MATCH_CACHE_SIZE
+from .constants import SPECIAL_ARGs
+
+_MISSING = object()  # sentinel for "no such attribute"
 
 
 def _strigify_val(val):
@@ -67,7 +71,13 @@ def enhanced_docstr(func):
         return func_spec
 
 
+_DENY_ALL = re.compile(r'(?!)')  # matches nothing (an empty negative lookahead always fails)
+
+
 class PermissibleAttr(object):
+    __slots__ = ('permissible_attrs', 'permissible_attr_pattern', '_literal_attrs', '_only_literal_attrs', '_match',
+                 '_is_match')
+
     def __init__(self, permissible_attrs=None):
         """
         A class whose objects are callable and play the role of an attribute filter.
@@ -86,21 +96,128 @@ class PermissibleAttr(object):
                 a dict with either
                     an "include", pointing to a list of patterns to include
                     an "exclude", pointing to a list of patterns to exclude
+            When there are no exclusions, the inclusions that are plain attribute paths (no regular expression
+            special characters except ".") are checked with a set lookup before (or instead of) the pattern.
+
+        >>> permissible_attr = PermissibleAttr(['greet', 'fcalc.compute', 'path.*'])
+        >>> permissible_attr('greet'), permissible_attr('fcalc.compute'), permissible_attr('path.isdir')
+        (True, True, True)
+        >>> permissible_attr('greeting'), permissible_attr('fcalc'), permissible_attr('fcalc.whoami')
+        (False, False, False)
         """
         self.permissible_attrs = permissible_attrs
+        self._literal_attrs, self._only_literal_attrs = _literal_attrs_of(permissible_attrs)
         if not permissible_attrs:  # we don't want to allow any attributes
-            permissible_attrs = re.compile('0')  # no attribute can have that pattern (can't start with a numerical)
+            permissible_attrs = _DENY_ALL
         else:
-            if isinstance(permissible_attrs, (list, tuple)):
-                permissible_attrs = {'include': permissible_attrs}
-            if isinstance(permissible_attrs, dict):
-                permissible_attrs = get_pattern_from_attr_permissions_dict(permissible_attrs)
-            else:
-                permissible_attrs = re.compile(permissible_attrs)
+            to_pattern = _TO_PATTERN_FOR_TYPE.get(type(permissible_attrs))
+            if to_pattern is None:  # not one of the exact types, so check for subclasses
+                if isinstance(permissible_attrs, (list, tuple)):
+                    to_pattern = _include_list_to_pattern
+                elif isinstance(permissible_attrs, dict):
+                    to_pattern = _permissions_dict_to_pattern
+                else:
+                    to_pattern = _compile_str_pattern
+            permissible_attrs = to_pattern(permissible_attrs)
         self.permissible_attr_pattern = permissible_attrs
+        self._match = permissible_attrs.match
+        # the few attrs that are requested over and over shouldn't have to go through the regex engine every time
+        self._is_match = lru_cache(maxsize=ATTR_MATCH_CACHE_SIZE)(self._is_match_uncached)
 
     def __call__(self, attr):
-        return bool(self.permissible_attr_pattern.match(attr))
+        if attr in self._literal_attrs:
+            return True
+        elif self._only_literal_attrs:
+            return False
+        return self._is_match(attr)
+
+    def _is_match_uncached(self, attr):
+        return self._match(attr) is not None
+
+
+_REGEX_SPECIAL_CHARS = frozenset('.^$*+?{}[]\\|()')
+
+
+def _literal_attrs_of(permissible_attrs):
+    """
+    Get the (literal_attrs, only_literal_attrs) pair for a PermissibleAttr specification, where literal_attrs is the
+    frozenset of the inclusions that are plain attribute paths (which the pattern would match anyway), and
+    only_literal_attrs says whether the pattern couldn't match anything else (so needn't be used at all).
+    Only list, tuple, or exclusion-less dict specifications have literal attrs.
+    >>> _literal_attrs_of(['greet', 'fcalc.compute', 'path.*']) == ({'greet', 'fcalc.compute'}, False)
+    True
+    >>> _literal_attrs_of({'include': ['greet', 'whoami']}) == ({'greet', 'whoami'}, True)
+    True
+    >>> _literal_attrs_of({'include': ['greet'], 'exclude': ['greet']})
+    (frozenset(), False)
+    """
+    if isinstance(permissible_attrs, dict):
+        if permissible_attrs.get('exclude'):
+            return frozenset(), False
+        include = permissible_attrs.get('include', ())
+    elif isinstance(permissible_attrs, (list, tuple)):
+        include = permissible_attrs
+    else:
+        return frozenset(), False
+    literal_attrs = set()
+    only_literal_attrs = bool(include)
+    for pattern in include:
+        special_chars = _REGEX_SPECIAL_CHARS.intersection(pattern)
+        if special_chars <= {'.'}:  # "." (meant as a path separator) matches itself
+            literal_attrs.add(pattern)
+            if special_chars:  # but also matches anything else, so we'll still need the pattern
+                only_literal_attrs = False
+        else:
+            only_literal_attrs = False
+    return frozenset(literal_attrs), only_literal_attrs
+
+
+def split_special_args(input_data):
+    """
+    Split an {arg: val, ...} dict into the (input_dict, meta) pair where meta holds the special args (see SPECIAL_ARGs)
+    and input_dict the others.
+    >>> split_special_args({'x': 1, '_help': True, 'y': 2})
+    ({'x': 1, 'y': 2}, {'_help': True})
+    """
+    input_dict, meta = {}, {}
+    for k, v in input_data.items():
+        if k in SPECIAL_ARGs:
+            meta[k] = v
+        else:
+            input_dict[k] = v
+    return input_dict, meta
+
+
+def _defining_class(cls, name):
+    """The class of cls's mro where name is defined, or None if it isn't"""
+    for klass in cls.__mro__:
+        if name in vars(klass):
+            return klass
+
+
+def with_meta(input_trans):
+    """
+    Get an input_trans returning (attr, input_dict, meta) triples from one returning (attr, input_data) pairs.
+    If input_trans has a with_meta method (as py2rest's InputTrans does), it's used as is, unless a subclass overrode
+    __call__ (and not with_meta), in which case input_trans is called, and its input_data split.
+    >>> class UpperAttrInputTrans(object):
+    ...     def __call__(self, request, **route_args):
+    ...         return request['attr'].upper(), dict(request['data'])
+    >>> with_meta(UpperAttrInputTrans())({'attr': 'foo', 'data': {'x': 1, '_help': True}})
+    ('FOO', {'x': 1}, {'_help': True})
+    """
+    input_trans_cls = type(input_trans)
+    with_meta_cls = _defining_class(input_trans_cls, 'with_meta')
+    if with_meta_cls is not None:
+        call_cls = _defining_class(input_trans_cls, '__call__')
+        if call_cls is None or issubclass(with_meta_cls, call_cls):
+            return input_trans.with_meta
+
+    def input_trans_with_meta(request, **route_args):
+        attr, input_data = input_trans(request, **route_args)
+        return (attr,) + split_special_args(input_data)
+
+    return input_trans_with_meta
 
 
 def obj_str_from_obj(obj):
@@ -114,6 +231,43 @@ def argname_based_specs_from(specs):
     pass
 
 
+# The endings of inclusion/exclusion patterns get_pattern_from_attr_permissions_dict cares about
+_ESCAPED_DOT_STAR, _DOT_STAR, _STAR, _DOT_DOLLAR, _DOLLAR = 'escaped_dot_star', 'dot_star', 'star', 'dot_dollar', 'dollar'
+_PATTERN_ENDING = re.compile(r'(?P<escaped_dot_star>\\\.\*)$|(?P<dot_star>\.\*)$|(?P<star>\*)$'
+                             r'|(?P<dot_dollar>\.\$)$|(?P<dollar>\$)$')
+
+
+def _pattern_ending(pattern):
+    """The (_ESCAPED_DOT_STAR, _DOT_STAR, _STAR, _DOT_DOLLAR or _DOLLAR) ending of a pattern, or None if none of these"""
+    m = _PATTERN_ENDING.search(pattern)
+    if m is not None:
+        return m.lastgroup
+
+
+def _normalize_include(include):
+    """An include pattern, made to end with $ unless it ends with .* (with a \\.* or * end corrected to .*)"""
+    ending = _pattern_ending(include)
+    if ending is None:
+        return include + '$'
+    elif ending == _ESCAPED_DOT_STAR:  # assume that's not what the user meant, so change
+        return include[:-3] + '.*'
+    elif ending == _STAR:  # assume that's not what the user meant, so change
+        return include[:-1] + '.*'
+    return include
+
+
+def _normalize_exclude(exclude):
+    """An exclude pattern, made to end with .* (to exclude all subpaths) unless it ends with .$ or .*"""
+    ending = _pattern_ending(exclude)
+    if ending is None:  # add to exclude all subpaths if not explicitly ending with "$"
+        return exclude + '.*'
+    elif ending == _ESCAPED_DOT_STAR:  # assume that's not what the user meant, so change
+        return exclude[:-3] + '.*'
+    elif ending == _STAR or ending == _DOLLAR:  # assume that's not what the user meant, so change
+        return exclude[:-1] + '.*'
+    return exclude
+
+
 def get_pattern_from_attr_permissions_dict(attr_permissions):
     """
     Construct a compiled regular expression from a permissions dict containing a list of what to include and exclude.
@@ -141,75 +295,196 @@ def get_pattern_from_attr_permissions_dict(attr_permissions):
     he.wants.that.other.thing: False
     i.want.ice.cream: False
     he.wants.me: False
+
+    Includes ending with .* (i.e. wildcard ones) don't win over exclusions though:
+    >>> r = get_pattern_from_attr_permissions_dict({'include': ['foo.*'], 'exclude': ['foo.secret']})
+    >>> bool(r.match('foo.bar')), bool(r.match('foo.secret')), bool(r.match('foo.secret.key'))
+    (True, False, False)
     """
 
-    s = ""
-
-    # process inclusions
-    corrected_list = []
-    for include in attr_permissions.get('include', []):
-        if not include.endswith('*'):
-            if not include.endswith('$'):
-                include += '$'
-        else:  # ends with "*"
-            if include.endswith('\.*'):
-                # assume that's not what the user meant, so change
-                include = include[:-3] + '.*'
-            elif include[-2] != '.':
-                # assume that's not what the user meant, so change
-                include = include[:-1] + '.*'
-        corrected_list.append(include)
-    s += '|'.join(corrected_list)
-
-    # process exclusions
-    corrected_list = []
-    for exclude in attr_permissions.get('exclude', []):
-        if not exclude.endswith('$') and not exclude.endswith('*'):
-            # add to exclude all subpaths if not explicitly ending with "$"
-            exclude += '.*'
-        else:  # ends with "*"
-            if exclude.endswith('\.*'):
-                # assume that's not what the user meant, so change
-                exclude = exclude[:-3] + '.*'
-            elif exclude[-2] != '.':
-                # assume that's not what the user meant, so change
-                exclude = exclude[:-1] + '.*'
-        corrected_list.append(exclude)
+    includes = [_normalize_include(include) for include in attr_permissions.get('include', [])]
+    corrected_list = [_normalize_exclude(exclude) for exclude in attr_permissions.get('exclude', [])]
     if corrected_list:
-        s += '(?!' + '|'.join(corrected_list) + ')'
+        # includes anchored with $ name attrs explicitly, so win over exclusions. Those ending with .* don't: the
+        # exclusion lookahead is put in front of them, where it's tested from the start of the attr.
+        exact_includes = [include for include in includes if not include.endswith('.*')]
+        wildcard_includes = [include for include in includes if include.endswith('.*')]
+        alternatives = exact_includes
+        if wildcard_includes or not exact_includes:  # (without any includes, all that isn't excluded is allowed)
+            alternatives = exact_includes + [''.join(('(?!(?:', '|'.join(corrected_list), '))(?:',
+                                                      '|'.join(wildcard_includes), ')'))]
+        s = '|'.join(alternatives)
+    else:
+        s = '|'.join(includes)
 
     return re.compile(s)
 
 
-def default_to_jdict(result, result_field=DFLT_RESULT_FIELD):
-    if isinstance(result, list):
-        return {result_field: result}
-    elif isinstance(result, dict) and len(result) > 0:
+@lru_cache(maxsize=ATTR_PATTERN_CACHE_SIZE)
+def _compile_attr_pattern(include, exclude):
+    """Cached get_pattern_from_attr_permissions_dict, taking the include and exclude patterns as tuples"""
+    return get_pattern_from_attr_permissions_dict({'include': include, 'exclude': exclude})
+
+
+# string specifications get their own cache, so they don't depend on re's (shared with everything else) cache
+_compile_str_pattern = lru_cache(maxsize=ATTR_PATTERN_CACHE_SIZE)(re.compile)
+
+
+def attr_pattern_cache_info():
+    """
+    The cache_info() of the compiled pattern caches shared by PermissibleAttr instances, keyed by kind of specification.
+    Many misses with a full cache (currsize == maxsize) mean the cache is thrashing, and ATTR_PATTERN_CACHE_SIZE
+    (see defaults) should be raised. Constructing a PermissibleAttr warms the cache up for its specification.
+    >>> sorted(attr_pattern_cache_info())
+    ['include_exclude', 'str']
+    """
+    return {'include_exclude': _compile_attr_pattern.cache_info(), 'str': _compile_str_pattern.cache_info()}
+
+
+def clear_attr_pattern_caches():
+    """Clear the compiled pattern caches shared by PermissibleAttr instances (existing instances keep their pattern)"""
+    _compile_attr_pattern.cache_clear()
+    _compile_str_pattern.cache_clear()
+
+
+def _include_list_to_pattern(permissible_attrs):
+    return _compile_attr_pattern(tuple(permissible_attrs), ())
+
+
+def _permissions_dict_to_pattern(permissible_attrs):
+    # (include, exclude) tuples, so that the same specification shares the same compiled pattern
+    return _compile_attr_pattern(tuple(permissible_attrs.get('include', ())),
+                                 tuple(permissible_attrs.get('exclude', ())))
+
+
+# exact type -> function making the pattern of a PermissibleAttr specification of that type
+_TO_PATTERN_FOR_TYPE = {list: _include_list_to_pattern, tuple: _include_list_to_pattern,
+                        dict: _permissions_dict_to_pattern, str: _compile_str_pattern, re.Pattern: _compile_str_pattern}
+
+
+def _wrap_in_result_field(result, result_field):
+    return {result_field: result}
+
+
+def _dict_to_jdict(result, result_field):
+    top_jdict = {}
+    stack = [(result, result_field, top_jdict)]  # the dicts to convert, and the (empty) jdicts to put them in
+    while stack:  # (a stack instead of recursion, for dicts of dicts (of dicts...))
+        result, result_field, jdict = stack.pop()
+        if len(result) == 0:
+            jdict[result_field] = result
+            continue
         first_key, first_val = next(iter(result.items()))  # look at the first key to determine what to do with the dict
-        if isinstance(first_key, int):
-            key_trans = chr
-        else:
-            key_trans = lambda x: x
         if isinstance(first_val, dict):
-            return {result_field: {key_trans(k): default_to_jdict(v) for k, v in iter(result.items())}}
+            jdict[result_field] = converted = {}
+            for k, v in zip(map(chr, result) if isinstance(first_key, int) else result, result.values()):
+                if isinstance(v, dict):  # it will be converted later, into the jdict we put here
+                    converted[k] = {}
+                    stack.append((v, DFLT_RESULT_FIELD, converted[k]))
+                else:
+                    converted[k] = default_to_jdict(v)
+        elif isinstance(first_key, int):
+            jdict.update(zip(map(chr, result), result.values()))
         else:
-            return {key_trans(k): v for k, v in iter(result.items())}
-    elif hasattr(result, 'to_json'):
+            jdict.update(result)
+    return top_jdict
+
+
+def _obj_to_jdict(result, result_field):
+    if hasattr(result, 'to_json'):
         return json.loads(result.to_json())
+    elif hasattr(result, '__next__'):  # an iterator (e.g. generator), which json can't serialize, so make it a list
+        return {result_field: list(result)}
     else:
+        return {result_field: result}
+
+
+_NUMBER_DTYPE_KINDS = frozenset('biuf')  # numpy dtype kinds of bools, (unsigned) ints and floats
+
+
+def _is_numeric_table(result):
+    """
+    Whether result is a (pandas like) Series or DataFrame of numbers, indexed by numbers or strings, whose to_dict()
+    can be serialized by orjson (unlike, say, the Timestamps of a DatetimeIndex, or datetime values)
+    """
+    try:
+        dtypes = result.dtypes  # a DataFrame's dtypes is a Series of dtypes, a Series' is a dtype
+        if not _NUMBER_DTYPE_KINDS.issuperset(dtype.kind for dtype in getattr(dtypes, 'values', (dtypes,))):
+            return False
+        return all(axis.dtype.kind in _NUMBER_DTYPE_KINDS or axis.inferred_type == 'string' for axis in result.axes)
+    except (AttributeError, TypeError):
+        return False
+
+
+def _raw_obj_to_jdict(result, result_field):
+    if hasattr(result, 'to_dict') and _is_numeric_table(result):  # same structure as to_json, no json text round trip
         try:
-            return {result_field: result}
-        except TypeError:
-            if hasattr(result, 'next'):
-                return {result_field: list(result)}
-            else:
-                return {result_field: str(result)}
+            return result.to_dict()
+        except Exception:  # not quite the to_dict we expected, so do it the safe way
+            pass
+    return _obj_to_jdict(result, result_field)
+
+
+_TO_JDICT_FOR_TYPE = {list: _wrap_in_result_field, dict: _dict_to_jdict}  # exact type -> to_jdict function
+# json scalars are just wrapped too (as lists are), without going through the isinstance and hasattr checks
+_TO_JDICT_FOR_TYPE.update(dict.fromkeys((str, int, float, bool, type(None)), _wrap_in_result_field))
+
+
+def default_to_jdict(result, result_field=DFLT_RESULT_FIELD, raw_numpy_ok=False):
+    """
+    Convert a result to a jsonizable dict.
+    If raw_numpy_ok, the result will be serialized by something that handles numpy (e.g. orjson with
+    OPT_SERIALIZE_NUMPY), so (pandas) Series and DataFrames of numbers, indexed by numbers or strings, are converted
+    with to_dict() instead of going through json.loads(result.to_json()). Others (e.g. with datetimes) still are.
+    >>> default_to_jdict([1, 2])
+    {'result': [1, 2]}
+    >>> default_to_jdict({'a': 1, 'b': 2})
+    {'a': 1, 'b': 2}
+    >>> default_to_jdict({97: {'x': [1]}})
+    {'result': {'a': {'x': [1]}}}
+    >>> default_to_jdict(3)
+    {'result': 3}
+    >>> default_to_jdict(x * 2 for x in range(3))
+    {'result': [0, 2, 4]}
+    """
+    to_jdict = _TO_JDICT_FOR_TYPE.get(type(result))
+    if to_jdict is None:  # not one of the exact types, so check for subclasses (e.g. OrderedDict)
+        if isinstance(result, list):
+            to_jdict = _wrap_in_result_field
+        elif isinstance(result, dict):
+            to_jdict = _dict_to_jdict
+        else:
+            to_jdict = _obj_to_jdict
+    if raw_numpy_ok and to_jdict is _obj_to_jdict:
+        to_jdict = _raw_obj_to_jdict
+    return to_jdict(result, result_field)
 
 
 def get_attr_recursively(obj, attr, default=None):
-    try:
-        for attr_str in attr.split('.'):
-            obj = getattr(obj, attr_str)
+    """
+    Get the (possibly nested) attribute specified by a period-separated attr path, or an already split one.
+    >>> import os
+    >>> get_attr_recursively(os, 'path.join') is os.path.join
+    True
+    >>> get_attr_recursively(os, ('path', 'join')) is os.path.join
+    True
+    >>> get_attr_recursively(os, 'path.no_such_thing', default='nope')
+    'nope'
+    >>> get_attr_recursively(os, 'sep') == os.sep
+    True
+    """
+    if not isinstance(attr, str):  # an already split path
+        for attr_str in attr:
+            obj = getattr(obj, attr_str, _MISSING)
+            if obj is _MISSING:
+                return default
         return obj
-    except AttributeError:
-        return default
+    if '.' not in attr:  # a single name (the usual case)
+        return getattr(obj, attr, default)
+    sep = '.'
+    while sep:  # walk the path without building the list of its names
+        attr_str, sep, attr = attr.partition('.')
+        obj = getattr(obj, attr_str, _MISSING)
+        if obj is _MISSING:
+            return default
+    return obj